@@ -45,13 +45,16 @@ Configuration:
 
 """
 
-import argparse
 import enum
-import fnmatch
-import socket
-import tomllib
-from itertools import count
+import os
+import stat
+import sys
+from collections.abc import Callable
 from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import argparse
 
 
 class VerboseLevel(enum.IntEnum):
@@ -73,38 +76,83 @@ class VerboseLevel(enum.IntEnum):
 
 MAX_VERBOSE = max(VerboseLevel)
 
+# Hot-path int mirrors of VerboseLevel: comparing against a plain int is a
+# C-level compare, while IntEnum.__ge__ dispatches through Python
+_RENAME_FILE = int(VerboseLevel.RENAME_FILE)
+_CREATE_LINK = int(VerboseLevel.CREATE_LINK)
+_LINK_OK = int(VerboseLevel.LINK_OK)
+
+
+def _noop(_msg: str) -> None:
+    """Discard a feedback message (bound when verbosity filters it out)."""
 
-def safe_remove(p: Path, verbose_level: VerboseLevel) -> Path:
+
+def safe_remove(
+    p: str,
+    on_rename: Callable[[str], object] | None = None,
+) -> str:
     """Safely rename a file or directory to a backup name.
 
-    Creates a backup by appending .bkp_N to the filename, where N is an incrementing
-    number starting from 0, continuing until an unused name is found.
+    Creates a backup by appending .bkp_N to the filename, where N is one above
+    the highest backup number already present in the directory.
 
     Args:
-        p: Path to the file or directory to be renamed
-        verbose_level: Controls the amount of feedback printed during operation
+        p: Absolute path of the file or directory to be renamed
+        on_rename: Sink for the rename message; pass _noop to silence it
+            (default: the current sys.stdout, resolved at call time)
 
     Returns:
-        Path: The new path where the file/directory was moved to
+        str: The new path where the file/directory was moved to
 
     """
-    if not p.is_absolute():
+    if not os.path.isabs(p):
         raise ValueError(f"{p} is not absolute")
-    if not p.exists(follow_symlinks=False):
-        raise ValueError(f"{p} does not exist")
-    for i in count():
-        p_backup = Path(f"{p}.bkp_{i}")
-        if not p_backup.exists(follow_symlinks=False):
-            break
-    if verbose_level >= VerboseLevel.RENAME_FILE:
-        print(f"renaming {p} -> {p_backup}")
-    p.rename(p_backup)
-    if p.exists(follow_symlinks=False):
-        raise RuntimeError(f"failed to move file: {p}")
+    try:
+        p_st = os.lstat(p)
+    except FileNotFoundError:
+        raise ValueError(f"{p} does not exist") from None
+    # One scandir pass instead of one lstat per candidate backup name
+    bkp_prefix = os.path.basename(p) + ".bkp_"
+    with os.scandir(os.path.dirname(p)) as it:
+        used = {
+            int(entry.name[len(bkp_prefix) :])
+            for entry in it
+            if entry.name.startswith(bkp_prefix)
+            and entry.name[len(bkp_prefix) :].isdigit()
+        }
+    start = max(used, default=-1) + 1
+    base = p + ".bkp_"
+    for i in range(start, start + 2**20):
+        p_backup = base + str(i)
+        try:
+            if stat.S_ISDIR(p_st.st_mode):
+                # directories can't be hard-linked; the scandir snapshot
+                # picked a free name, so plain rename is safe here
+                os.rename(p, p_backup)
+            else:
+                # hard-link + unlink moves atomically without clobbering:
+                # a concurrent claim of the same name raises instead
+                os.link(p, p_backup, follow_symlinks=False)
+                os.unlink(p)
+        except FileExistsError:
+            continue
+        break
+    else:
+        raise RuntimeError(f"too many backups of {p}")
+    if on_rename is not _noop:
+        write = sys.stdout.write if on_rename is None else on_rename
+        write(f"renaming {p} -> {p_backup}\n")
     return p_backup
 
 
-def safe_link(src: Path, dst: Path, verbose_level: VerboseLevel) -> None:
+def safe_link(
+    src: str,
+    dst: str,
+    created_dirs: set[str] | None = None,
+    on_rename: Callable[[str], object] | None = None,
+    on_link: Callable[[str], object] | None = None,
+    on_ok: Callable[[str], object] | None = None,
+) -> None:
     """Create a symbolic link from dst to src, safely handling existing files.
 
     If dst already exists, it will be backed up using safe_remove() before
@@ -112,54 +160,170 @@ def safe_link(src: Path, dst: Path, verbose_level: VerboseLevel) -> None:
     in which case no action is taken.
 
     Args:
-        src: Path to the source file/directory to link to
-        dst: Path where the symbolic link should be created
-        verbose_level: Controls the amount of feedback printed during operation
+        src: Absolute path of the source file/directory to link to
+        dst: Absolute path where the symbolic link should be created
+        created_dirs: Optional set of parent dirs already known to exist,
+            used to skip redundant mkdir calls across many links
+        on_rename: Sink for backup-rename messages; _noop silences them
+        on_link: Sink for link-creation messages; _noop silences them
+        on_ok: Sink for already-correct-link messages; _noop silences them
+            (sinks default to the current sys.stdout, resolved at call time)
 
     """
-    if not dst.is_absolute():
+    if not os.path.isabs(dst):
         raise ValueError(f"{dst} is not absolute")
-    if not src.is_absolute():
+    if not os.path.isabs(src):
         raise ValueError(f"{src} is not absolute")
-    is_dir = "/" if src.is_dir() else ""
-    if not src.exists(follow_symlinks=True):
+    # One stat for src and one lstat for dst cover all the checks below
+    try:
+        src_st = os.stat(src)
+    except FileNotFoundError:
         # TODO: maybe here i want to mv dst -> src instead?
-        raise ValueError(f"src {src} not found")
-    if dst.is_symlink() and dst.readlink() == src:
-        if verbose_level >= VerboseLevel.LINK_OK:
-            print(f"exists   {dst} <- {src}{is_dir}")
+        raise ValueError(f"src {src} not found") from None
+    # the "/" marker is only ever printed, so skip it entirely in quiet mode
+    is_dir = ""
+    if on_link is not _noop:
+        is_dir = "/" if stat.S_ISDIR(src_st.st_mode) else ""
+    try:
+        dst_st: os.stat_result | None = os.lstat(dst)
+    except FileNotFoundError:
+        dst_st = None
+    if (
+        dst_st is not None
+        and stat.S_ISLNK(dst_st.st_mode)
+        # raw-string compare: no Path construction on the common re-run path
+        and os.readlink(dst) == src
+    ):
+        if on_ok is not _noop:
+            write = sys.stdout.write if on_ok is None else on_ok
+            write(f"exists   {dst} <- {src}{is_dir}\n")
         return
-    if dst.exists(follow_symlinks=False):
-        safe_remove(dst, verbose_level)
-    if verbose_level >= VerboseLevel.CREATE_LINK:
-        print(f"linking  {dst} <- {src}{is_dir}")
-    dst.parent.mkdir(exist_ok=True, parents=True)
-    dst.symlink_to(src)
+    if dst_st is not None:
+        safe_remove(dst, on_rename)
+    if on_link is not _noop:
+        write = sys.stdout.write if on_link is None else on_link
+        write(f"linking  {dst} <- {src}{is_dir}\n")
+    parent = os.path.dirname(dst)
+    if created_dirs is None or parent not in created_dirs:
+        os.makedirs(parent, exist_ok=True)
+        if created_dirs is not None:
+            created_dirs.add(parent)
+    os.symlink(src, dst)
+
+
+# A planned filesystem action: (op, dst, src) where op is "link" or "remove"
+Action = tuple[str, str, str | None]
+
+
+def _plan(
+    locations: list[tuple[str, str | None]],
+    on_ok: Callable[[str], object] | None = None,
+) -> list[Action]:
+    """Validate all entries and decide the actions to take, without mutating.
+
+    Already-correct links are reported (at LINK_OK verbosity) and dropped
+    here, using one scandir per unique parent directory instead of an
+    lstat+readlink pair per link.
+
+    Raises:
+        ValueError: If any path is relative or any source is missing.
+            Since nothing has been renamed or linked yet at that point, a bad
+            entry late in the list can no longer leave earlier destinations
+            already backed up.
+    """
+    actions: list[Action] = []
+    for dst, src in locations:
+        if not os.path.isabs(dst):
+            raise ValueError(f"{dst} is not absolute")
+        if src is None:
+            if os.path.lexists(dst):
+                actions.append(("remove", dst, None))
+        else:
+            if not os.path.isabs(src):
+                raise ValueError(f"{src} is not absolute")
+            if not os.path.exists(src):
+                raise ValueError(f"src {src} not found")
+            actions.append(("link", dst, src))
+    # Collect the targets of all existing symlinks in the affected dirs
+    existing: dict[str, str] = {}
+    for parent in {os.path.dirname(dst) for op, dst, _src in actions if op == "link"}:
+        try:
+            with os.scandir(parent) as it:
+                for entry in it:
+                    if entry.is_symlink():
+                        existing[entry.path] = os.readlink(entry.path)
+        except FileNotFoundError:
+            pass
+    if not existing:
+        return actions
+    kept: list[Action] = []
+    for op, dst, src in actions:
+        if op == "link" and existing.get(dst) == src:
+            if on_ok is not _noop:
+                is_dir = "/" if src is not None and os.path.isdir(src) else ""
+                write = sys.stdout.write if on_ok is None else on_ok
+                write(f"exists   {dst} <- {src}{is_dir}\n")
+            continue
+        kept.append((op, dst, src))
+    return kept
 
 
 def install_links(
-    locations: dict[Path, Path | None],
-    verbose_level: VerboseLevel = MAX_VERBOSE,
+    locations: list[tuple[str, str | None]],
+    verbose_level: int = int(MAX_VERBOSE),
 ) -> None:
-    """Install symbolic links according to the locations dictionary.
+    """Install symbolic links according to the locations list.
 
-    For each entry in locations, creates a symbolic link from the destination
-    (key) to the source (value). If the value is None, the destination file
-    is removed (with backup).
+    For each (destination, source) pair in locations, creates a symbolic link
+    from the destination to the source. If the source is None, the destination
+    file is removed (with backup). All entries are validated up front, so no
+    file is touched unless the whole list is executable.
 
     Args:
-        locations: Dictionary mapping destination paths to source paths
+        locations: Pairs of absolute destination and source path strings
         verbose_level: Controls the amount of feedback printed
 
     """
-    # Sort by path depth so parent dirs are linked before files inside them
-    # (e.g. .config/fish/ before .config/fish/config-local.fish)
-    for dst, src in sorted(locations.items(), key=lambda item: len(item[0].parts)):
-        if src is None:
-            if dst.exists(follow_symlinks=False):
-                safe_remove(dst, verbose_level)
-        else:
-            safe_link(src, dst, verbose_level)
+    # Buffer messages and emit them in one write at the end: O(1) write
+    # syscalls instead of one per link, and list.append is atomic, so
+    # concurrent workers can't interleave partial lines
+    from concurrent.futures import ThreadPoolExecutor
+
+    buf: list[str] = []
+    writer = buf.append
+    # Bind the per-level printers once; the verbosity decision then happens
+    # here instead of on every safe_link/safe_remove call
+    on_rename = writer if verbose_level >= _RENAME_FILE else _noop
+    on_link = writer if verbose_level >= _CREATE_LINK else _noop
+    on_ok = writer if verbose_level >= _LINK_OK else _noop
+    actions = _plan(locations, on_ok)
+    created_dirs: set[str] = set()
+
+    def process(op: str, dst: str, src: str | None) -> None:
+        if op == "remove":
+            safe_remove(dst, on_rename)
+        elif src is not None:
+            safe_link(src, dst, created_dirs, on_rename, on_link, on_ok)
+
+    # Group by path depth so parent dirs are linked before files inside them
+    # (e.g. .config/fish/ before .config/fish/config-local.fish); entries at
+    # the same depth are independent, so run them on a thread pool (the GIL
+    # is released around the underlying syscalls)
+    by_depth: dict[int, list[Action]] = {}
+    for action in actions:
+        by_depth.setdefault(action[1].count(os.sep), []).append(action)
+    try:
+        for depth in sorted(by_depth):
+            batch = by_depth[depth]
+            if len(batch) == 1:
+                process(*batch[0])
+                continue
+            with ThreadPoolExecutor(max_workers=min(32, len(batch))) as ex:
+                for future in [ex.submit(process, *action) for action in batch]:
+                    future.result()
+    finally:
+        if buf:
+            sys.stdout.write("".join(buf))
 
 
 def _resolve_entry(
@@ -171,6 +335,8 @@ def _resolve_entry(
         str: source path (may be "")
         None: entry should be skipped (condition not met)
     """
+    import fnmatch
+
     if isinstance(value, str):
         return value
     if isinstance(value, dict):
@@ -198,7 +364,7 @@ def read_locations_file(
     allow_linking_outside_dst_dir: bool = False,
     fail_if_relative_dst: bool = False,
     fail_if_absolute_dst: bool = False,
-) -> dict[Path, Path | None]:
+) -> list[tuple[str, str | None]]:
     """Read link specifications from a TOML file.
 
     The TOML file should contain key-value pairs where:
@@ -213,50 +379,74 @@ def read_locations_file(
         dst_dir: Base directory where links will be created (default: user's home)
 
     Returns:
-        Dictionary mapping destination Paths to source Paths or None
+        List of (destination, source) pairs of absolute path strings,
+        where the source is None for entries to remove
     """
+    import mmap
+    import socket
+    import tomllib
+
     if fail_if_relative_dst and fail_if_absolute_dst:
         raise ValueError("Can't require both relative and absolute")
-    with Path(toml_file).open("rb") as f:
-        data = tomllib.load(f)
+    # mmap the config instead of reading it through the buffered-IO stack
+    fd = os.open(toml_file, os.O_RDONLY)
+    try:
+        size = os.fstat(fd).st_size
+        if size == 0:
+            data = {}
+        else:
+            with mmap.mmap(fd, size, access=mmap.ACCESS_READ) as mm:
+                data = tomllib.loads(bytes(mm).decode("utf-8"))
+    finally:
+        os.close(fd)
     hostname = socket.gethostname()
     short_hostname = hostname.split(".")[0]
-    locations = {}
+    # a flat list of pairs: downstream only iterates, so there is no reason
+    # to pay for a hash table (TOML keys are unique already)
+    locations: list[tuple[str, str | None]] = []
     for dst, value in data.items():
         resolved = _resolve_entry(value, hostname, short_hostname)
         if resolved is not None:
-            locations[Path(dst)] = Path(resolved) if resolved else None
-    # check dst
-    if fail_if_relative_dst and any(not dst.is_absolute() for dst in locations):
-        raise ValueError("settings require all dst must be absolute")
-    if fail_if_absolute_dst and any(dst.is_absolute() for dst in locations):
-        raise ValueError("settings require all dst must be relative")
-    # check src
-    if any(src is not None and src.is_absolute() for src in locations.values()):
-        raise ValueError("all src must be relative")
-    # resolve locations
-    dst_dir = dst_dir.resolve()
-    src_dir = src_dir.resolve()
-    locations_full = {
-        dst_dir / dst.expanduser(): None if src is None else src_dir / src
-        for dst, src in locations.items()
-    }
-    # check parents
-    if not allow_linking_outside_dst_dir and not all(
-        dst_dir in dst.parents for dst in locations_full
-    ):
-        raise ValueError(f"settings require all dst must be inside {dst_dir}")
-    if not all(
-        src is None or src_dir in src.parents for src in locations_full.values()
-    ):
-        # this should never fail, since we checked that all src in locations are
-        #  relative
-        raise ValueError(f"all src must be inside {src_dir}")
+            locations.append((dst, resolved if resolved else None))
+    # check dst and src in a single pass, raising on the first violation
+    for dst, src in locations:
+        if fail_if_relative_dst and not os.path.isabs(dst):
+            raise ValueError("settings require all dst must be absolute")
+        if fail_if_absolute_dst and os.path.isabs(dst):
+            raise ValueError("settings require all dst must be relative")
+        if src is not None and os.path.isabs(src):
+            raise ValueError("all src must be relative")
+    # resolve locations, staying on plain strings until the final syscalls
+    dst_dir_str = str(dst_dir.resolve())
+    src_dir_str = str(src_dir.resolve())
+    # normpath restores the normalization Path used to apply implicitly
+    # (trailing slashes, doubled separators), which the depth grouping and
+    # os.symlink both rely on
+    locations_full = [
+        (
+            os.path.normpath(os.path.join(dst_dir_str, os.path.expanduser(dst))),
+            None if src is None else os.path.normpath(os.path.join(src_dir_str, src)),
+        )
+        for dst, src in locations
+    ]
+    # check parents, also in one pass (prefix compare avoids walking the
+    # parent chain per path)
+    dst_prefix = dst_dir_str + os.sep
+    src_prefix = src_dir_str + os.sep
+    for dst, src in locations_full:
+        if not allow_linking_outside_dst_dir and not dst.startswith(dst_prefix):
+            raise ValueError(f"settings require all dst must be inside {dst_dir_str}")
+        if src is not None and not src.startswith(src_prefix):
+            # this should never fail, since we checked that all src in
+            #  locations are relative
+            raise ValueError(f"all src must be inside {src_dir_str}")
     # result
     return locations_full
 
 
-def parse_args() -> argparse.Namespace:
+def parse_args() -> "argparse.Namespace":
+    import argparse
+
     parser = argparse.ArgumentParser(description="install links to a list of files")
     parser.add_argument(
         "SRC_DIR",
@@ -297,7 +487,7 @@ def main() -> None:
     args = parse_args()
     src_dir = args.SRC_DIR
     dst_dir = args.dest_dir
-    verbose_level = VerboseLevel(MAX_VERBOSE - args.quiet)
+    verbose_level = int(VerboseLevel(MAX_VERBOSE - args.quiet))
     locations = read_locations_file(src_dir / "locations.toml", src_dir, dst_dir)
     install_links(locations, verbose_level)
 